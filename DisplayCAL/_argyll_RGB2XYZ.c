@@ -0,0 +1,88 @@
+/* Compiled scalar kernel for DisplayCAL.argyll_RGB2XYZ.RGB2XYZ
+ *
+ * This module is optional. If it isn't available, argyll_RGB2XYZ falls back
+ * to numba (if installed) or plain Python.
+ */
+
+#define PY_SSIZE_T_CLEAN
+#include <Python.h>
+#include <math.h>
+
+/* Colorant matrix with Y normalization and black glare folded in, and black
+ * glare offset. Set once from Python via set_transform() */
+static double m[3][3];
+static double k[3];
+
+/* Both segments are computed and selected without branching on v, which is
+ * unpredictable for arbitrary patch data. Compilers turn the ternaries into
+ * conditional moves/blends. NaN is passed through. */
+static double
+eotf(double v)
+{
+    double lo, hi;
+
+    v = v < 0.0 ? 0.0 : v;
+    v = v > 1.0 ? 1.0 : v;
+    lo = v / 12.92;
+    hi = pow((0.055 + v) / 1.055, 2.4); /* Gamma */
+    return v <= 0.03928 ? lo : hi;
+}
+
+static PyObject *
+set_transform(PyObject *self, PyObject *args)
+{
+    if (!PyArg_ParseTuple(args, "(ddd)(ddd)(ddd)(ddd)",
+                          &m[0][0], &m[0][1], &m[0][2],
+                          &m[1][0], &m[1][1], &m[1][2],
+                          &m[2][0], &m[2][1], &m[2][2],
+                          &k[0], &k[1], &k[2]))
+        return NULL;
+    Py_RETURN_NONE;
+}
+
+static PyObject *
+rgb2xyz(PyObject *self, PyObject *const *args, Py_ssize_t nargs)
+{
+    double rgb[3];
+    Py_ssize_t i;
+
+    if (nargs != 3) {
+        PyErr_Format(PyExc_TypeError,
+                     "rgb2xyz() takes exactly 3 arguments (%zd given)", nargs);
+        return NULL;
+    }
+    for (i = 0; i < 3; i++) {
+        rgb[i] = PyFloat_AsDouble(args[i]);
+        if (rgb[i] == -1.0 && PyErr_Occurred())
+            return NULL;
+        rgb[i] = eotf(rgb[i]);
+    }
+    return Py_BuildValue(
+        "(ddd)",
+        m[0][0] * rgb[0] + m[0][1] * rgb[1] + m[0][2] * rgb[2] + k[0],
+        m[1][0] * rgb[0] + m[1][1] * rgb[1] + m[1][2] * rgb[2] + k[1],
+        m[2][0] * rgb[0] + m[2][1] * rgb[1] + m[2][2] * rgb[2] + k[2]);
+}
+
+static PyMethodDef methods[] = {
+    {"set_transform", set_transform, METH_VARARGS,
+     "set_transform(M0, M1, M2, K)\n\n"
+     "Set the 3x3 matrix rows and offset used by rgb2xyz."},
+    {"rgb2xyz", (PyCFunction)(void (*)(void))rgb2xyz, METH_FASTCALL,
+     "rgb2xyz(R, G, B) -> (X, Y, Z)"},
+    {NULL, NULL, 0, NULL}
+};
+
+static struct PyModuleDef module = {
+    PyModuleDef_HEAD_INIT,
+    "_argyll_RGB2XYZ",
+    "Compiled scalar kernel for DisplayCAL.argyll_RGB2XYZ.RGB2XYZ",
+    -1,
+    methods
+};
+
+PyMODINIT_FUNC
+PyInit__argyll_RGB2XYZ(void)
+{
+    return PyModule_Create(&module);
+}
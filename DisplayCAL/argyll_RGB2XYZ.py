@@ -1,9 +1,14 @@
 # -*- coding: utf-8 -*-
 
-import math
+import numpy as np
 
 from DisplayCAL import colormath
 
+try:
+    from DisplayCAL import _argyll_RGB2XYZ
+except ImportError:
+    _argyll_RGB2XYZ = None
+
 # from xcolorants.c
 icx_ink_table = {
     "C": [[0.12, 0.18, 0.48], [0.12, 0.18, 0.48]],
@@ -39,42 +44,148 @@ for e in range(3):
     s["Ynorm"] += icx_ink_table[s["iix"][e]][0][1]
 s["Ynorm"] = 1.0 / s["Ynorm"]
 
+# Colorant matrix (columns are the R, G and B inks) and black glare
+M = np.array([[icx_ink_table[s["iix"][e]][0][j] for e in range(3)] for j in range(3)])
+K = np.array(icx_ink_table["K"][0])
+
+# Normalizing Y to 1.0 and adding black glare is the affine transform
+# XYZ * _A + K, removing it is (XYZ - K) * _A_inv
+_A = s["Ynorm"] * (1.0 - K)
+_A_inv = 1.0 / _A
+_A0, _A1, _A2 = _A.tolist()
+_A_inv0, _A_inv1, _A_inv2 = _A_inv.tolist()
+_K0, _K1, _K2 = K.tolist()
+
 
 def XYZ_denormalize_remove_glare(X, Y, Z):
-    XYZ = [X, Y, Z]
     # De-Normalise Y from 1.0, & remove black glare
-    for j in range(3):
-        XYZ[j] = (XYZ[j] - icx_ink_table["K"][0][j]) / (1.0 - icx_ink_table["K"][0][j])
-        XYZ[j] /= s["Ynorm"]
-    return tuple(XYZ)
+    return ((X - _K0) * _A_inv0, (Y - _K1) * _A_inv1, (Z - _K2) * _A_inv2)
 
 
 def XYZ_normalize_add_glare(X, Y, Z):
-    XYZ = [X, Y, Z]
     # Normalise Y to 1.0, & add black glare
-    for j in range(3):
-        XYZ[j] *= s["Ynorm"]
-        XYZ[j] = XYZ[j] * (1.0 - icx_ink_table["K"][0][j]) + icx_ink_table["K"][0][j]
-    return tuple(XYZ)
+    return (X * _A0 + _K0, Y * _A1 + _K1, Z * _A2 + _K2)
 
 
-def RGB2XYZ(R, G, B):  # from xcolorants.c -> icxColorantLu_to_XYZ
-    d = (R, G, B)
-    # We assume a simple additive model with gamma
-    XYZ = [0.0, 0.0, 0.0]
-    for e in range(3):
-        v = d[e]
+def _eotf(v):
+    """sRGB-like EOTF applied to a scalar or array, with input clipped to 0..1."""
+    v = np.clip(v, 0.0, 1.0)
+    return np.where(v <= 0.03928, v / 12.92, ((0.055 + v) / 1.055) ** 2.4)
+
+
+# Colorant matrix with Y normalization and black glare folded in, so that
+# RGB2XYZ boils down to _M @ _eotf(RGB) + K
+_M = M * _A[:, np.newaxis]
+if _argyll_RGB2XYZ:
+    _argyll_RGB2XYZ.set_transform(*_M.tolist(), K.tolist())
+
+# EOTF lookup table for 8-bit quantized input (n / 255.0)
+_SRGB_LUT = _eotf(np.arange(256) / 255.0)
+
+
+def _make_rgb2xyz_kernel(jit=None):
+    """Return a scalar RGB to XYZ function, compiled with jit if given."""
+
+    # Bind the fused matrix and glare as closure constants, which are cheaper
+    # to access than globals and which numba compiles in as literals
+    (m00, m01, m02), (m10, m11, m12), (m20, m21, m22) = _M.tolist()
+    k0, k1, k2 = _K0, _K1, _K2
+    # numba wants an array, plain Python is faster indexing a tuple
+    lut = _SRGB_LUT if jit else tuple(_SRGB_LUT.tolist())
+
+    def eotf(v):
         if v < 0.0:
             v = 0.0
         elif v > 1.0:
             v = 1.0
-        if v <= 0.03928:
-            v /= 12.92
+        elif v != v:
+            # NaN
+            return v
+        i = v * 255.0
+        n = int(i + 0.5)
+        if abs(i - n) < 1e-9:
+            # 8-bit quantized value
+            return lut[n]
+        # Compute both segments and select, so numba can compile this to a
+        # blend instead of a branch that is unpredictable for arbitrary input
+        lo = v / 12.92
+        hi = ((0.055 + v) / 1.055) ** 2.4  # Gamma
+        return lo if v <= 0.03928 else hi
+
+    if jit:
+        eotf = jit(eotf)
+
+    def kernel(R, G, B):
+        r = eotf(R)
+        g = eotf(G)
+        b = eotf(B)
+        return (
+            m00 * r + m01 * g + m02 * b + k0,
+            m10 * r + m11 * g + m12 * b + k1,
+            m20 * r + m21 * g + m22 * b + k2,
+        )
+
+    if jit:
+        kernel = jit(kernel)
+    return kernel
+
+
+_rgb2xyz_kernel = None
+
+
+def _get_rgb2xyz_kernel():
+    """Return the scalar RGB to XYZ kernel.
+
+    The compiled _argyll_RGB2XYZ extension is preferred if it was built.
+    Otherwise numba is imported lazily on first use, and if it is available
+    the kernel is compiled to native code, else a pure Python kernel is used.
+    """
+    global _rgb2xyz_kernel
+    if _rgb2xyz_kernel is None:
+        if _argyll_RGB2XYZ:
+            _rgb2xyz_kernel = _argyll_RGB2XYZ.rgb2xyz
+            return _rgb2xyz_kernel
+        try:
+            import numba
+        except ImportError:
+            _rgb2xyz_kernel = _make_rgb2xyz_kernel()
         else:
-            v = math.pow((0.055 + v) / 1.055, 2.4)  # Gamma
-        for j in range(3):
-            XYZ[j] += v * icx_ink_table[s["iix"][e]][0][j]
-    return XYZ_normalize_add_glare(*XYZ)
+            # All fast-math flags except "nnan" and "ninf", so NaN input
+            # gives NaN output like the other kernels
+            _rgb2xyz_kernel = _make_rgb2xyz_kernel(
+                numba.njit(
+                    cache=True, fastmath={"afn", "arcp", "contract", "nsz", "reassoc"}
+                )
+            )
+    return _rgb2xyz_kernel
+
+
+def RGB2XYZ(R, G, B):  # from xcolorants.c -> icxColorantLu_to_XYZ
+    """Convert RGB to XYZ.
+
+    R, G and B may be scalars or equally shaped arrays. Returns a tuple of
+    floats for scalar input, or a tuple of arrays otherwise.
+    """
+    kernel = _rgb2xyz_kernel or _get_rgb2xyz_kernel()
+    # Float input is by far the most common and np.ndim() costs more than the
+    # kernel itself, so check for it first
+    if type(R) is float and type(G) is float and type(B) is float:
+        return kernel(R, G, B)
+    if np.ndim(R) or np.ndim(G) or np.ndim(B):
+        # We assume a simple additive model with gamma
+        XYZ = np.tensordot(_M, _eotf(np.array([R, G, B], dtype=np.float64)), 1)
+        return tuple(XYZ + K.reshape((3,) + (1,) * (XYZ.ndim - 1)))
+    return kernel(float(R), float(G), float(B))
+
+
+def RGB2XYZ_array(RGB, dtype=np.float64):
+    """Convert an array of RGB triplets with shape (N, 3) to XYZ (N, 3).
+
+    The conversion is done in the given dtype. np.float32 halves memory
+    traffic, which pays off for large (several thousand patches) arrays.
+    """
+    XYZ = _eotf(np.asarray(RGB, dtype=dtype)) @ _M.T.astype(dtype, copy=False)
+    return XYZ + K.astype(dtype, copy=False)
 
 
 def XYZ2RGB(X, Y, Z):
@@ -1,14 +1,13 @@
 # -*- coding: utf-8 -*-
 
 from hashlib import md5
-import codecs
-import math
+import functools
 import os
 import re
-import string
 import struct
 import subprocess
 import sys
+import threading
 
 
 if sys.platform == "win32":
@@ -34,7 +33,7 @@ elif sys.platform == "darwin":
 from DisplayCAL import config
 from DisplayCAL import RealDisplaySizeMM as RDSMM
 from DisplayCAL.util_os import which
-from DisplayCAL.util_str import make_ascii_printable, safe_str, strtr
+from DisplayCAL.util_str import ascii_printable, safe_str
 
 if sys.platform == "win32":
     from DisplayCAL import util_win
@@ -61,24 +60,46 @@ HI_B_X = 31
 HI_B_Y = 32
 HI_W_X = 33
 HI_W_Y = 34
-BLOCKS = ((54, 72), (72, 90), (90, 108), (108, 126))
-BLOCK_TYPE = 3
-BLOCK_CONTENTS = (5, 18)
-BLOCK_TYPE_SERIAL_ASCII = b"\xff"
-BLOCK_TYPE_ASCII = b"\xfe"
-BLOCK_TYPE_MONITOR_NAME = b"\xfc"
-BLOCK_TYPE_COLOR_POINT = b"\xfb"
-BLOCK_TYPE_COLOR_MANAGEMENT_DATA = b"\xf9"
+BLOCKS = (54, 126)
+# Descriptor block: 3 zero bytes, block type, reserved byte, 13 bytes contents
+BLOCK = struct.Struct("<3sBx13s")
+BLOCK_TYPE_SERIAL_ASCII = 0xFF
+BLOCK_TYPE_ASCII = 0xFE
+BLOCK_TYPE_MONITOR_NAME = 0xFC
+BLOCK_TYPE_COLOR_POINT = 0xFB
+BLOCK_TYPE_COLOR_MANAGEMENT_DATA = 0xF9
+BLOCK_TEXT_TYPES = {
+    BLOCK_TYPE_SERIAL_ASCII: "serial_ascii",
+    BLOCK_TYPE_ASCII: "ascii",
+    BLOCK_TYPE_MONITOR_NAME: "monitor_name",
+}
 EXTENSION_FLAG = 126
 CHECKSUM = 127
 BLOCK_DI_EXT = b"\x40"
 TRC = (81, 127)
+# PRODUCT_ID to MAX_V_SIZE_CM (skipping the video input definition byte)
+BASIC_DISPLAY_PARAMETERS = struct.Struct("<HIBBBBxBB")
+# LO_RG_XY to HI_W_Y
+CHROMATICITY_COORDINATES = struct.Struct("<10B")
 
 pnpidcache = {}
+_pnpidcache_loaded = False
+_pnpidcache_lock = threading.Lock()
 
+# EDID in ioreg -c IODisplay -S -w0 output (Mac OS X)
+_IOREG_EDID_RE = re.compile(rb'"IODisplayEDID"\s*=\s*<([0-9A-Fa-f]*)>')
 
-def combine_hi_8lo(hi, lo):
-    return hi << 8 | lo
+# hwdb, e.g.
+# acpi:AAA*:
+#  ID_VENDOR_FROM_DATABASE=Avolites Ltd
+_HWDB_RE = re.compile(
+    r"^[ \t]*acpi:([^:\n]{1,3}).*\n[ \t]*ID_VENDOR_FROM_DATABASE=[ \t]*(.*?)[ \t\r]*$",
+    re.MULTILINE,
+)
+# pnp.ids, e.g.
+# AAA<TAB>Avolites Ltd
+# ([^\S\n] is whitespace other than newline, including non-breaking space)
+_PNPID_RE = re.compile(r"^[^\S\n]*(\S+)[^\S\n]+(\S.*?)[^\S\n]*$", re.MULTILINE)
 
 
 def get_edid(display_no=0, display_name=None, device=None):
@@ -193,12 +214,8 @@ def get_edid(display_no=0, display_name=None, device=None):
         stdout, stderr = p.communicate()
         if not stdout:
             return {}
-        for edid in [
-            binascii.unhexlify(edid_hex)
-            for edid_hex in re.findall(
-                r'"IODisplayEDID"\s*=\s*<([0-9A-Fa-f]*)>', stdout.decode()
-            )
-        ]:
+        for match in _IOREG_EDID_RE.finditer(stdout):
+            edid = binascii.unhexlify(match.group(1))
             if not edid or len(edid) < 128:
                 continue
             parsed_edid = parse_edid(edid)
@@ -252,11 +269,11 @@ def parse_manufacturer_id(block):
 
     The range is always ASCII charcode 64 to 95.
     """
-    h = combine_hi_8lo(block[0], block[1])
-    manufacturer_id = []
-    for shift in (10, 5, 0):
-        manufacturer_id.append(chr(((h >> shift) & 0x1F) + ord("A") - 1))
-    return "".join(manufacturer_id).strip()
+    h = block[0] << 8 | block[1]
+    # 5 bits per letter, 1 = "A" i.e. ord("A") - 1 = 64
+    return bytes(
+        (((h >> 10) & 0x1F) + 64, ((h >> 5) & 0x1F) + 64, (h & 0x1F) + 64)
+    ).decode("ascii")
 
 
 def get_manufacturer_name(manufacturer_id):
@@ -278,7 +295,21 @@ def get_manufacturer_name(manufacturer_id):
     https://github.com/systemd/systemd/blob/master/hwdb/20-acpi-vendor.hwdb
 
     """
-    if not pnpidcache:
+    if not _pnpidcache_loaded:
+        load_pnpidcache()
+    return pnpidcache.get(manufacturer_id)
+
+
+def load_pnpidcache():
+    """Fill pnpidcache from the first hwdb or pnp.ids file found.
+
+    Only the first call looks for the files, later calls do nothing, even if no
+    file was found. Concurrent calls wait until the first one is done.
+    """
+    global _pnpidcache_loaded
+    with _pnpidcache_lock:
+        if _pnpidcache_loaded:
+            return
         paths = [
             "/usr/lib/udev/hwdb.d/20-acpi-vendor.hwdb",  # systemd
             "/usr/share/hwdata/pnp.ids",  # hwdata, e.g. Red Hat
@@ -292,56 +323,35 @@ def get_manufacturer_name(manufacturer_id):
         for path in paths:
             if os.path.isfile(path):
                 try:
-                    pnp_ids = codecs.open(path, "r", "UTF-8", "replace")
-                except IOError:
-                    pass
-                else:
-                    id, name = None, None
-                    try:
-                        for line in pnp_ids:
-                            if path.endswith("hwdb"):
-                                if line.strip().startswith("acpi:"):
-                                    id = line.split(":")[1][:3]
-                                    continue
-                                elif line.strip().startswith("ID_VENDOR_FROM_DATABASE"):
-                                    name = line.split("=", 1)[1].strip()
-                                else:
-                                    continue
-                                if not id or not name or id in pnpidcache:
-                                    continue
-                            else:
-                                try:
-                                    # Strip leading/trailing whitespace
-                                    # (non-breaking spaces too)
-                                    id, name = line.strip(
-                                        string.whitespace + "\u00a0"
-                                    ).split(None, 1)
-                                except ValueError:
-                                    continue
-                            pnpidcache[id] = name
-                    except OSError:
-                        continue
-                    finally:
-                        pnp_ids.close()
-                    break
-    return pnpidcache.get(manufacturer_id)
-
-
-def edid_get_bit(value, bit):
-    return (value & (1 << bit)) >> bit
+                    parse_pnpid_file(path)
+                except OSError:
+                    continue
+                break
+        # Only set once done, so other threads wait for the lock meanwhile
+        # instead of seeing an empty cache
+        _pnpidcache_loaded = True
+
+
+def parse_pnpid_file(path):
+    """Parse a hwdb or pnp.ids file and add its entries to pnpidcache."""
+    with open(path, "r", encoding="UTF-8", errors="replace") as pnp_ids:
+        data = pnp_ids.read()
+    if path.endswith("hwdb"):
+        for id, name in _HWDB_RE.findall(data):
+            if name and id not in pnpidcache:
+                pnpidcache[id] = name
+    else:
+        pnpidcache.update(_PNPID_RE.findall(data))
 
 
-def edid_get_bits(value, begin, end):
-    mask = (1 << (end - begin + 1)) - 1
-    return (value >> begin) & mask
+def edid_decode_fraction(high, low):
+    # 10-bit binary fraction, i.e. the sum of bit i * 2 ** (i - 10)
+    return ((high << 2) | low) / 1024.0
 
 
-def edid_decode_fraction(high, low):
-    result = 0.0
-    high = (high << 2) | low
-    for i in range(0, 10):
-        result += edid_get_bit(high, i) * math.pow(2, i - 10)
-    return result
+# bytes.translate tables for edid_parse_string
+_EDID_NEWLINE_TABLE = bytes.maketrans(b"\n\r", b"\x00\x00")
+_EDID_PRINTABLE_TABLE = bytes(i if chr(i) in ascii_printable else 0 for i in range(256))
 
 
 def edid_parse_string(desc):
@@ -349,11 +359,11 @@ def edid_parse_string(desc):
     # Remember: In C, NULL terminates a string, so do the same here
     # Replace newline with NULL, then strip anything after first NULL byte
     # (if any), then strip trailing whitespace
-    desc = strtr(desc[:13], {b"\n": b"\x00", b"\r": b"\x00"}).split(b"\x00")[0].rstrip()
+    desc = desc[:13].translate(_EDID_NEWLINE_TABLE).partition(b"\x00")[0].rstrip()
     if desc:
         # Replace all non-printable chars with NULL
         # Afterwards, the amount of NULL bytes is the number of replaced chars
-        desc = make_ascii_printable(desc, substitute=b"\x00")
+        desc = desc.translate(_EDID_PRINTABLE_TABLE)
         if desc.count(b"\x00") <= 4:
             # Only use string if max 4 replaced chars
             # Replace any NULL chars with dashes to make a printable string
@@ -372,6 +382,16 @@ def parse_edid(edid):
         # This apparently is a wrong conversion.
         edid = edid.decode("utf-8").encode("latin-1")
 
+    # Return a copy so callers modifying the result don't alter the cache
+    return dict(_parse_edid_cached(bytes(edid)))
+
+
+@functools.lru_cache(maxsize=32)
+def _parse_edid_cached(edid):
+    """Parse raw EDID data (bytes) and return dict.
+
+    Results are cached, as the same EDID is usually parsed repeatedly.
+    """
     result = {
         "edid": edid,
         "hash": md5(edid).hexdigest(),
@@ -384,105 +404,94 @@ def parse_edid(edid):
     if manufacturer:
         result["manufacturer"] = manufacturer
 
-    result["product_id"] = struct.unpack("<H", edid[PRODUCT_ID[0] : PRODUCT_ID[1]])[0]
-    result["serial_32"] = struct.unpack("<I", edid[SERIAL_32[0] : SERIAL_32[1]])[0]
-    result["week_of_manufacture"] = edid[WEEK_OF_MANUFACTURE]
-    result["year_of_manufacture"] = edid[YEAR_OF_MANUFACTURE] + 1990
-    result["edid_version"] = edid[EDID_VERSION]
-    result["edid_revision"] = edid[EDID_REVISION]
-
-    result["max_h_size_cm"] = edid[MAX_H_SIZE_CM]
-    result["max_v_size_cm"] = edid[MAX_V_SIZE_CM]
+    (
+        result["product_id"],
+        result["serial_32"],
+        result["week_of_manufacture"],
+        year_of_manufacture,
+        result["edid_version"],
+        result["edid_revision"],
+        result["max_h_size_cm"],
+        result["max_v_size_cm"],
+    ) = BASIC_DISPLAY_PARAMETERS.unpack_from(edid, PRODUCT_ID[0])
+    result["year_of_manufacture"] = year_of_manufacture + 1990
     if edid[GAMMA] != b"\xff":
         result["gamma"] = edid[GAMMA] / 100.0 + 1
     result["features"] = edid[FEATURES]
 
-    result["red_x"] = edid_decode_fraction(
-        edid[HI_R_X], edid_get_bits(edid[LO_RG_XY], 6, 7)
-    )
-    result["red_y"] = edid_decode_fraction(
-        edid[HI_R_Y], edid_get_bits(edid[LO_RG_XY], 4, 5)
-    )
-
-    result["green_x"] = edid_decode_fraction(
-        edid[HI_G_X], edid_get_bits(edid[LO_RG_XY], 2, 3)
-    )
-    result["green_y"] = edid_decode_fraction(
-        edid[HI_G_Y], edid_get_bits(edid[LO_RG_XY], 0, 1)
-    )
-
-    result["blue_x"] = edid_decode_fraction(
-        edid[HI_B_X], edid_get_bits(edid[LO_BW_XY], 6, 7)
-    )
-    result["blue_y"] = edid_decode_fraction(
-        edid[HI_B_Y], edid_get_bits(edid[LO_BW_XY], 4, 5)
-    )
-
-    result["white_x"] = edid_decode_fraction(
-        edid[HI_W_X], edid_get_bits(edid[LO_BW_XY], 2, 3)
-    )
-    result["white_y"] = edid_decode_fraction(
-        edid[HI_W_Y], edid_get_bits(edid[LO_BW_XY], 0, 1)
-    )
-
-    text_types = {
-        BLOCK_TYPE_SERIAL_ASCII: "serial_ascii",
-        BLOCK_TYPE_ASCII: "ascii",
-        BLOCK_TYPE_MONITOR_NAME: "monitor_name",
-    }
+    (
+        lo_rg_xy,
+        lo_bw_xy,
+        hi_r_x,
+        hi_r_y,
+        hi_g_x,
+        hi_g_y,
+        hi_b_x,
+        hi_b_y,
+        hi_w_x,
+        hi_w_y,
+    ) = CHROMATICITY_COORDINATES.unpack_from(edid, LO_RG_XY)
+    result["red_x"] = edid_decode_fraction(hi_r_x, (lo_rg_xy >> 6) & 3)
+    result["red_y"] = edid_decode_fraction(hi_r_y, (lo_rg_xy >> 4) & 3)
+
+    result["green_x"] = edid_decode_fraction(hi_g_x, (lo_rg_xy >> 2) & 3)
+    result["green_y"] = edid_decode_fraction(hi_g_y, lo_rg_xy & 3)
+
+    result["blue_x"] = edid_decode_fraction(hi_b_x, (lo_bw_xy >> 6) & 3)
+    result["blue_y"] = edid_decode_fraction(hi_b_y, (lo_bw_xy >> 4) & 3)
+
+    result["white_x"] = edid_decode_fraction(hi_w_x, (lo_bw_xy >> 2) & 3)
+    result["white_y"] = edid_decode_fraction(hi_w_y, lo_bw_xy & 3)
+
     # Parse descriptor blocks
-    for start, stop in BLOCKS:
-        block = edid[start:stop]
-        if block[:BLOCK_TYPE] != b"\x00\x00\x00":
+    for prefix, block_type, contents in BLOCK.iter_unpack(edid[BLOCKS[0] : BLOCKS[1]]):
+        if prefix != b"\x00\x00\x00":
             # Ignore pixel clock data
             continue
-        text_type = text_types.get(block[BLOCK_TYPE : BLOCK_TYPE + 1])
+        text_type = BLOCK_TEXT_TYPES.get(block_type)
         if text_type:
-            desc = edid_parse_string(block[BLOCK_CONTENTS[0] : BLOCK_CONTENTS[1]])
+            desc = edid_parse_string(contents)
             if desc is not None:
                 result[text_type] = desc.decode("utf-8")
-        elif block[BLOCK_TYPE] == BLOCK_TYPE_COLOR_POINT:
-            for i in (5, 10):
+        elif block_type == BLOCK_TYPE_COLOR_POINT:
+            for i in (0, 5):
                 # 2nd white point index in range 1...255
                 # 3rd white point index in range 2...255
                 # 0 = do not use
-                if block[i] > i / 5:
+                index = contents[i]
+                if index > i // 5 + 1:
                     white_x = edid_decode_fraction(
-                        edid[i + 2], edid_get_bits(edid[i + 1], 2, 3)
+                        contents[i + 2], (contents[i + 1] >> 2) & 3
                     )
-                    result["white_x_" + str(block[i])] = white_x
+                    result["white_x_" + str(index)] = white_x
                     if not result.get("white_x"):
                         result["white_x"] = white_x
-                    white_y = edid_decode_fraction(
-                        edid[i + 3], edid_get_bits(edid[i + 1], 0, 1)
-                    )
-                    result["white_y_" + str(block[i])] = white_y
+                    white_y = edid_decode_fraction(contents[i + 3], contents[i + 1] & 3)
+                    result["white_y_" + str(index)] = white_y
                     if not result.get("white_y"):
                         result["white_y"] = white_y
-                    if block[i + 4] != "\xff":
-                        gamma = block[i + 4] / 100.0 + 1
-                        result["gamma_" + str(block[i])] = gamma
+                    if contents[i + 4] != 0xFF:
+                        gamma = contents[i + 4] / 100.0 + 1
+                        result["gamma_" + str(index)] = gamma
                         if not result.get("gamma"):
                             result["gamma"] = gamma
-        elif block[BLOCK_TYPE] == BLOCK_TYPE_COLOR_MANAGEMENT_DATA:
+        elif block_type == BLOCK_TYPE_COLOR_MANAGEMENT_DATA:
             # TODO: Implement? How could it be used?
-            result["color_management_data"] = block[
-                BLOCK_CONTENTS[0] : BLOCK_CONTENTS[1]
-            ]
+            result["color_management_data"] = contents
 
     result["ext_flag"] = edid[EXTENSION_FLAG]
     result["checksum"] = edid[CHECKSUM]
-    result["checksum_valid"] = sum(char for char in edid) % 256 == 0
+    result["checksum_valid"] = sum(edid) & 0xFF == 0
 
     if len(edid) > 128 and result["ext_flag"] > 0:
-        # Parse extension blocks
-        block = edid[128:]
-        while block:
-            if block[0] == BLOCK_DI_EXT:
-                if block[TRC[0]] != "\0":
+        # Parse complete extension blocks (memoryview slices don't copy)
+        edid_view = memoryview(edid)
+        for offset in range(128, len(edid) - 127, 128):
+            block = edid_view[offset : offset + 128]
+            if block[0:1] == BLOCK_DI_EXT:
+                if block[TRC[0]] != 0:
                     # TODO: Implement
                     pass
-            block = block[128:]
 
     return result
 
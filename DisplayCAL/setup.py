@@ -909,7 +909,15 @@ def setup():
         libraries = ["X11", "Xinerama", "Xrandr", "Xxf86vm"]
         link_args = None
 
-    ext_modules = []
+    ext_modules = [
+        # Optional, argyll_RGB2XYZ falls back to numba or Python without it
+        Extension(
+            f"{name}._argyll_RGB2XYZ",
+            sources=[f"{name}/_argyll_RGB2XYZ.c"],
+            extra_compile_args=None if sys.platform == "win32" else ["-O3"],
+            optional=True,
+        )
+    ]
 
     requires = []
     if not setuptools or sys.platform != "win32":
@@ -1,5 +1,11 @@
 # -*- coding: utf-8 -*-
 
+import atexit
+import threading
+import time
+import weakref
+
+from comtypes import COMError, GUID
 import comtypes.gen.TaskbarLib as tbl
 import comtypes.client as cc
 
@@ -10,21 +16,106 @@ TBPF_NORMAL = 0x2
 TBPF_ERROR = 0x4
 TBPF_PAUSED = 0x8
 
-taskbar = cc.CreateObject(
-    "{56FDF344-FD6D-11d0-958A-006097C9A090}", interface=tbl.ITaskbarList3
-)
-taskbar.HrInit()
+CLSID_TaskbarList = GUID("{56FDF344-FD6D-11d0-958A-006097C9A090}")
+
+_taskbar = None
+_taskbar_lock = threading.Lock()
+
+
+def get_taskbar():
+    """Return the ITaskbarList3 instance shared by all Taskbar objects.
+
+    It is created on first use. Returns None if it can't be created.
+    """
+    global _taskbar
+    if _taskbar is None:
+        with _taskbar_lock:
+            if _taskbar is None:
+                try:
+                    taskbar = cc.CreateObject(
+                        CLSID_TaskbarList, interface=tbl.ITaskbarList3
+                    )
+                    taskbar.HrInit()
+                except (COMError, OSError) as exception:
+                    print(exception)
+                    # Don't try again
+                    taskbar = False
+                _taskbar = taskbar
+    return _taskbar or None
+
+
+def _release_taskbar():
+    # Registered after comtypes' own exit handler, so this runs first and the
+    # interface is released while COM is still initialized
+    global _taskbar
+    _taskbar = None
+    for taskbar in list(Taskbar._frame_cache.values()):
+        taskbar.close()
+
+
+atexit.register(_release_taskbar)
 
 
 class Taskbar(object):
+    # Taskbar instances by window handle
+    _frame_cache = weakref.WeakValueDictionary()
+
     def __init__(self, frame, maxv=100):
         self.frame = frame
         self.maxv = maxv
+        self.taskbar = get_taskbar()
+        # The window handle doesn't change for the lifetime of the frame
+        self._hwnd = frame.GetHandle() if frame else None
+        self._enabled = self.taskbar is not None and self._hwnd is not None
+        if self._enabled:
+            self._set_progress_value = self.taskbar.SetProgressValue
+            self._set_progress_state = self.taskbar.SetProgressState
+        self._last_percent = -1
+        self._last_time = 0.0
+
+    @classmethod
+    def for_frame(cls, frame, maxv=100):
+        """Return the Taskbar for frame, creating it if needed."""
+        key = frame.GetHandle()
+        taskbar = cls._frame_cache.get(key)
+        if (
+            taskbar is None
+            or taskbar.taskbar is None
+            or not taskbar.frame
+            or taskbar.maxv != maxv
+        ):
+            taskbar = cls._frame_cache[key] = cls(frame, maxv)
+        return taskbar
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """Stop updating the taskbar button and drop the interface reference."""
+        self._enabled = False
+        self.taskbar = self._set_progress_value = self._set_progress_state = None
 
     def set_progress_value(self, value):
-        if self.frame:
-            taskbar.SetProgressValue(self.frame.GetHandle(), value, self.maxv)
+        if self._enabled and self.frame:
+            # Skip updates that wouldn't visibly change the taskbar button,
+            # but always pass on the final value
+            percent = value * 100 // self.maxv
+            now = time.monotonic()
+            if (
+                percent == self._last_percent
+                and now - self._last_time < 0.033
+                and value != self.maxv
+            ):
+                return
+            self._last_percent = percent
+            self._last_time = now
+            self._set_progress_value(self._hwnd, value, self.maxv)
 
     def set_progress_state(self, state):
-        if self.frame:
-            taskbar.SetProgressState(self.frame.GetHandle(), state)
+        if self._enabled and self.frame:
+            # Make sure the next value is passed on after a state change
+            self._last_percent = -1
+            self._set_progress_state(self._hwnd, state)
@@ -2543,7 +2543,7 @@ class BaseInteractiveDialog(wx.Dialog):
                 if hasattr(taskbarframe, "taskbar"):
                     self.taskbar = taskbarframe.taskbar
                 else:
-                    self.taskbar = taskbar.Taskbar(taskbarframe)
+                    self.taskbar = taskbar.Taskbar.for_frame(taskbarframe)
         self.SetPosition(pos)  # yes, this is needed
 
         self.Bind(wx.EVT_SHOW, self.OnShow, self)
@@ -6747,7 +6747,9 @@ class ProgressDialog(wx.Dialog):
                 taskbarframe = self.Parent
             else:
                 taskbarframe = self
-            self.taskbar = taskbar.Taskbar(taskbarframe, self.gauge.GetRange())
+            self.taskbar = taskbar.Taskbar.for_frame(
+                taskbarframe, self.gauge.GetRange()
+            )
             self.taskbar.set_progress_state(taskbar.TBPF_INDETERMINATE)
 
     def stop_timer(self, immediate=True):
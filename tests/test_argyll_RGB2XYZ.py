@@ -1,43 +1,47 @@
 # -*- coding: utf-8 -*-
+import math
+
+import numpy as np
 import pytest
 
-from DisplayCAL.argyll_RGB2XYZ import RGB2XYZ, XYZ2RGB
+from DisplayCAL import argyll_RGB2XYZ
+from DisplayCAL.argyll_RGB2XYZ import RGB2XYZ, RGB2XYZ_array, XYZ2RGB
+
+RGB_XYZ = (
+    ((1.0, 1.0, 1.0), (0.951065, 1.000000, 1.088440)),
+    ((0.0, 0.0, 0.0), (0.010000, 0.010000, 0.010000)),
+    ((0.5, 0.0, 0.0), (0.097393, 0.055060, 0.014095)),
+    ((1.0, 0.0, 0.0), (0.418302, 0.220522, 0.029132)),
+    ((0.0, 0.5, 0.0), (0.085782, 0.161542, 0.035261)),
+    ((0.5, 0.5, 0.0), (0.173175, 0.206603, 0.039356)),
+    ((1.0, 0.5, 0.0), (0.494083, 0.372064, 0.054393)),
+    ((0.0, 1.0, 0.0), (0.364052, 0.718005, 0.128018)),
+    ((0.5, 1.0, 0.0), (0.451445, 0.763065, 0.132113)),
+    ((1.0, 1.0, 0.0), (0.772354, 0.928527, 0.147151)),
+    ((0.0, 0.0, 0.5), (0.048252, 0.025298, 0.211475)),
+    ((0.5, 0.0, 0.5), (0.135645, 0.070358, 0.215570)),
+    ((1.0, 0.0, 0.5), (0.456553, 0.235820, 0.230607)),
+    ((0.0, 0.5, 0.5), (0.124033, 0.176840, 0.236735)),
+    ((0.5, 0.5, 0.5), (0.211427, 0.221901, 0.240831)),
+    ((1.0, 0.5, 0.5), (0.532335, 0.387362, 0.255868)),
+    ((0.0, 1.0, 0.5), (0.402304, 0.733303, 0.329493)),
+    ((0.5, 1.0, 0.5), (0.489697, 0.778364, 0.333588)),
+    ((1.0, 1.0, 0.5), (0.810605, 0.943825, 0.348625)),
+    ((0.0, 0.0, 1.0), (0.188711, 0.081473, 0.951290)),
+    ((0.5, 0.0, 1.0), (0.276104, 0.126533, 0.955385)),
+    ((1.0, 0.0, 1.0), (0.597013, 0.291995, 0.970422)),
+    ((0.0, 0.5, 1.0), (0.264493, 0.233015, 0.976550)),
+    ((0.5, 0.5, 1.0), (0.351886, 0.278076, 0.980645)),
+    ((1.0, 0.5, 1.0), (0.672794, 0.443537, 0.995683)),
+    ((0.0, 1.0, 1.0), (0.542763, 0.789478, 1.069308)),
+    ((0.5, 1.0, 1.0), (0.630157, 0.834539, 1.073403)),
+)
 
 
 @pytest.mark.parametrize("colorspace", ("RGB", "XYZ"))
 def test_agryll_colorspace_conversion(colorspace: str) -> None:
     """Test value conversion between RGB and XYZ colorspace."""
-    for RGB, XYZ in iter(
-        (
-            ((1.0, 1.0, 1.0), (0.951065, 1.000000, 1.088440)),
-            ((0.0, 0.0, 0.0), (0.010000, 0.010000, 0.010000)),
-            ((0.5, 0.0, 0.0), (0.097393, 0.055060, 0.014095)),
-            ((1.0, 0.0, 0.0), (0.418302, 0.220522, 0.029132)),
-            ((0.0, 0.5, 0.0), (0.085782, 0.161542, 0.035261)),
-            ((0.5, 0.5, 0.0), (0.173175, 0.206603, 0.039356)),
-            ((1.0, 0.5, 0.0), (0.494083, 0.372064, 0.054393)),
-            ((0.0, 1.0, 0.0), (0.364052, 0.718005, 0.128018)),
-            ((0.5, 1.0, 0.0), (0.451445, 0.763065, 0.132113)),
-            ((1.0, 1.0, 0.0), (0.772354, 0.928527, 0.147151)),
-            ((0.0, 0.0, 0.5), (0.048252, 0.025298, 0.211475)),
-            ((0.5, 0.0, 0.5), (0.135645, 0.070358, 0.215570)),
-            ((1.0, 0.0, 0.5), (0.456553, 0.235820, 0.230607)),
-            ((0.0, 0.5, 0.5), (0.124033, 0.176840, 0.236735)),
-            ((0.5, 0.5, 0.5), (0.211427, 0.221901, 0.240831)),
-            ((1.0, 0.5, 0.5), (0.532335, 0.387362, 0.255868)),
-            ((0.0, 1.0, 0.5), (0.402304, 0.733303, 0.329493)),
-            ((0.5, 1.0, 0.5), (0.489697, 0.778364, 0.333588)),
-            ((1.0, 1.0, 0.5), (0.810605, 0.943825, 0.348625)),
-            ((0.0, 0.0, 1.0), (0.188711, 0.081473, 0.951290)),
-            ((0.5, 0.0, 1.0), (0.276104, 0.126533, 0.955385)),
-            ((1.0, 0.0, 1.0), (0.597013, 0.291995, 0.970422)),
-            ((0.0, 0.5, 1.0), (0.264493, 0.233015, 0.976550)),
-            ((0.5, 0.5, 1.0), (0.351886, 0.278076, 0.980645)),
-            ((1.0, 0.5, 1.0), (0.672794, 0.443537, 0.995683)),
-            ((0.0, 1.0, 1.0), (0.542763, 0.789478, 1.069308)),
-            ((0.5, 1.0, 1.0), (0.630157, 0.834539, 1.073403)),
-        )
-    ):
+    for RGB, XYZ in RGB_XYZ:
         if colorspace == "RGB":
             conversion = tuple(str(round(c, 6)) for c in RGB2XYZ(*RGB))
             result = tuple(str(c) for c in XYZ)
@@ -45,3 +49,79 @@ def test_agryll_colorspace_conversion(colorspace: str) -> None:
             conversion = tuple(str(round(c, 1)) for c in XYZ2RGB(*XYZ))
             result = tuple(str(c) for c in RGB)
         assert conversion == result
+
+
+def test_agryll_rgb2xyz_array() -> None:
+    """Test array RGB to XYZ conversion matches the scalar conversion."""
+    RGB = [(1.0, 1.0, 1.0), (0.0, 0.0, 0.0), (0.5, 0.0, 1.0), (1.0, 0.5, 0.5)]
+    XYZ = RGB2XYZ_array(RGB)
+    assert XYZ.shape == (4, 3)
+    for rgb, xyz in zip(RGB, XYZ):
+        assert tuple(xyz) == pytest.approx(RGB2XYZ(*rgb))
+
+
+def test_agryll_rgb2xyz_array_float32() -> None:
+    """Test array RGB to XYZ conversion in single precision."""
+    RGB = [(1.0, 1.0, 1.0), (0.0, 0.0, 0.0), (0.5, 0.0, 1.0), (1.0, 0.5, 0.5)]
+    XYZ = RGB2XYZ_array(RGB, dtype=np.float32)
+    assert XYZ.dtype == np.float32
+    assert XYZ == pytest.approx(RGB2XYZ_array(RGB), abs=1e-6)
+
+
+@pytest.fixture(params=("python", "numba", "extension"))
+def rgb2xyz_kernel(request):
+    """Scalar RGB to XYZ kernel for each backend."""
+    if request.param == "python":
+        return argyll_RGB2XYZ._make_rgb2xyz_kernel()
+    if request.param == "numba":
+        numba = pytest.importorskip("numba")
+        return argyll_RGB2XYZ._make_rgb2xyz_kernel(numba.njit)
+    extension = pytest.importorskip("DisplayCAL._argyll_RGB2XYZ")
+    return extension.rgb2xyz
+
+
+def test_agryll_rgb2xyz_kernel(rgb2xyz_kernel) -> None:
+    """Test the scalar kernels against the reference values."""
+    for RGB, XYZ in RGB_XYZ:
+        assert rgb2xyz_kernel(*RGB) == pytest.approx(XYZ, abs=5e-7)
+
+
+@pytest.mark.parametrize(
+    "RGB",
+    (
+        # 8-bit quantized (lookup table)
+        (1 / 255.0, 10 / 255.0, 128 / 255.0),
+        (254 / 255.0, 100 / 255.0, 7 / 255.0),
+        # In between 8-bit steps
+        (0.0001, 0.03928, 0.5001),
+        (0.3, 0.51, 0.999),
+        # Out of range
+        (-0.5, 1.5, 0.25),
+        (-1e-9, 1.0 + 1e-9, 2.0),
+    ),
+)
+def test_agryll_rgb2xyz_kernel_matches_array(rgb2xyz_kernel, RGB) -> None:
+    """Test the scalar kernels against the NumPy array conversion."""
+    assert rgb2xyz_kernel(*RGB) == pytest.approx(
+        tuple(RGB2XYZ_array([RGB])[0]), rel=1e-12, abs=1e-15
+    )
+
+
+def test_agryll_rgb2xyz_kernel_nan(rgb2xyz_kernel) -> None:
+    """Test the scalar kernels pass NaN through."""
+    assert all(math.isnan(v) for v in rgb2xyz_kernel(float("nan"), 0.5, 0.5))
+    assert rgb2xyz_kernel(0.5, 0.5, 0.5) == pytest.approx(
+        RGB2XYZ(0.5, 0.5, 0.5), rel=1e-12
+    )
+
+
+def test_agryll_rgb2xyz_extension_set_transform() -> None:
+    """Test setting the matrix and offset used by the C extension."""
+    extension = pytest.importorskip("DisplayCAL._argyll_RGB2XYZ")
+    try:
+        extension.set_transform((1, 0, 0), (0, 2, 0), (0, 0, 3), (0.1, 0.2, 0.3))
+        assert extension.rgb2xyz(1.0, 1.0, 0.0) == pytest.approx((1.1, 2.2, 0.3))
+        with pytest.raises(TypeError):
+            extension.rgb2xyz(1.0, 1.0)
+    finally:
+        extension.set_transform(*argyll_RGB2XYZ._M.tolist(), argyll_RGB2XYZ.K.tolist())
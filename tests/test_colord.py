@@ -1,17 +1,12 @@
 # -*- coding: utf-8 -*-
-import sys
-from DisplayCAL import RealDisplaySizeMM, config
 from DisplayCAL.colord import device_id_from_edid
-from DisplayCAL.dev.mocks import check_call
-from DisplayCAL.edid import get_edid
-from tests.data.display_data import DisplayData
 import pytest
 
 
-def test_device_id_from_edid_1():
-    """Testing DisplayCAL.colord.device_id_from_edid() function."""
-
-    edid = {
+@pytest.fixture(scope="module")
+def edid():
+    """EDID data as returned by DisplayCAL.edid.parse_edid()."""
+    return {
         "edid": b"00ffffffffffff005a633a7a0f010101311e0104b53c22783bb091ab524ea0260f505"
             b"4bfef80e1c0d100d1c0b300a9408180810081c0565e00a0a0a02950302035005550210000"
             b"1a000000ff005738553230343930303130340a000000fd00184b0f5a1e000a20202020202"
@@ -46,6 +41,14 @@ def test_device_id_from_edid_1():
         "checksum_valid": False,
     }
 
-    device_id = device_id_from_edid(edid)
+
+@pytest.fixture(scope="module")
+def device_id(edid):
+    """Device ID for the edid fixture."""
+    return device_id_from_edid(edid)
+
+
+def test_device_id_from_edid_1(device_id):
+    """Testing DisplayCAL.colord.device_id_from_edid() function."""
     assert isinstance(device_id, str)
     assert device_id == "xrandr-808478310"
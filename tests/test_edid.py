@@ -1,4 +1,5 @@
 # -*- coding: utf-8 -*-
+import binascii
 import codecs
 import sys
 
@@ -8,7 +9,13 @@ from DisplayCAL import config, RealDisplaySizeMM
 from DisplayCAL.config import getcfg
 from DisplayCAL.dev.mocks import check_call
 from tests.data.display_data import DisplayData
-from DisplayCAL.edid import get_edid, parse_edid, parse_manufacturer_id
+from DisplayCAL import edid
+from DisplayCAL.edid import (
+    get_edid,
+    parse_edid,
+    parse_manufacturer_id,
+    parse_pnpid_file,
+)
 
 
 # @pytest.mark.skipif(sys.platform == "darwin", reason="Not working as expected on MacOS")
@@ -302,6 +309,24 @@ def test_get_edid_4(
     assert result == expected_result
 
 
+def test_get_edid_darwin(monkeypatch, patch_subprocess):
+    """DisplayCAL.edid.get_edid() gets the EDID data from ioreg on Mac OS X."""
+    monkeypatch.setattr("DisplayCAL.edid.subprocess", patch_subprocess)
+    monkeypatch.setattr("DisplayCAL.edid.sys.platform", "darwin")
+    monkeypatch.setattr("DisplayCAL.edid.binascii", binascii, raising=False)
+    expected_result = DisplayData.DISPLAY_DATA_2
+    patch_subprocess.output["ioreg-cIODisplay-S-w0"] = (
+        b'    | |   "IODisplayEDID" = <>\n'
+        b'    | |   "IODisplayEDID" = <'
+        + binascii.hexlify(expected_result["edid"])
+        + b">\n"
+    )
+    display_name = expected_result.get("monitor_name", expected_result.get("ascii"))
+
+    assert get_edid(display_name=display_name) == expected_result
+    assert get_edid(display_name="Unknown display") == {}
+
+
 def test_parse_edid_1():
     """Testing DisplayCAL.edid.parse_edid() function."""
     raw_edid = (
@@ -643,8 +668,98 @@ def test_parse_edid_6():
     assert result == DisplayData.DISPLAY_DATA_2
 
 
+def test_parse_edid_color_point_descriptor():
+    """parse_edid() parses additional white points."""
+    edid = bytearray(DisplayData.DISPLAY_DATA_2["edid"])
+    edid[108:126] = (
+        b"\x00\x00\x00\xfb\x00"
+        b"\x02\x00\x50\x54\x78"  # white point index 2, x, y, gamma 2.2
+        b"\x00\x00\x00\x00\x00"  # unused
+        b"\x0a\x20\x20"
+    )
+    result = parse_edid(bytes(edid))
+    assert result["white_x_2"] == 0.3125
+    assert result["white_y_2"] == 0.328125
+    assert result["gamma_2"] == pytest.approx(2.2)
+    assert "white_x_0" not in result
+    assert result["white_x"] == DisplayData.DISPLAY_DATA_2["white_x"]
+    assert result["gamma"] == DisplayData.DISPLAY_DATA_2["gamma"]
+
+
 def test_parse_manufacturer_id_1():
     """Test parse_manufacturer_id."""
     manufacturer_id_raw = b"\x10\xac"
     manufacturer_id = parse_manufacturer_id(manufacturer_id_raw)
     assert manufacturer_id == "DEL"
+
+
+def test_parse_edid_returns_a_copy_of_the_cached_result():
+    """parse_edid() results can be modified without altering later results."""
+    edid = DisplayData.DISPLAY_DATA_2["edid"]
+    result = parse_edid(edid)
+    result["monitor_name"] = "modified"
+    assert parse_edid(edid) == DisplayData.DISPLAY_DATA_2
+
+
+def test_parse_pnpid_file_hwdb(monkeypatch, tmp_path):
+    """parse_pnpid_file() parses systemd hwdb files."""
+    monkeypatch.setattr("DisplayCAL.edid.pnpidcache", {})
+    hwdb_path = tmp_path / "20-acpi-vendor.hwdb"
+    hwdb_path.write_text(
+        "# This file is part of systemd.\n"
+        "\n"
+        "acpi:AAA*:\n"
+        " ID_VENDOR_FROM_DATABASE=Avolites Ltd\n"
+        "\n"
+        "acpi:SAM*:\n"
+        " ID_VENDOR_FROM_DATABASE=Samsung Electric Company\n"
+        "\n"
+        "acpi:SAM*:\n"
+        " ID_VENDOR_FROM_DATABASE=Duplicate\n"
+    )
+    parse_pnpid_file(str(hwdb_path))
+    assert edid.pnpidcache == {
+        "AAA": "Avolites Ltd",
+        "SAM": "Samsung Electric Company",
+    }
+
+
+def test_get_manufacturer_name_looks_for_pnpid_files_once(monkeypatch):
+    """get_manufacturer_name() doesn't look for pnp.ids again if none was found."""
+    monkeypatch.setattr("DisplayCAL.edid.pnpidcache", {})
+    monkeypatch.setattr("DisplayCAL.edid._pnpidcache_loaded", False)
+    checked_paths = []
+
+    def isfile(path):
+        checked_paths.append(path)
+        return False
+
+    monkeypatch.setattr("DisplayCAL.edid.os.path.isfile", isfile)
+    assert edid.get_manufacturer_name("SAM") is None
+    assert checked_paths
+    checked_paths.clear()
+    assert edid.get_manufacturer_name("SAM") is None
+    assert checked_paths == []
+
+
+def test_load_pnpidcache_marks_cache_loaded_when_done(monkeypatch, tmp_path):
+    """get_manufacturer_name() doesn't see a partially loaded pnpidcache."""
+    monkeypatch.setattr("DisplayCAL.edid.pnpidcache", {})
+    monkeypatch.setattr("DisplayCAL.edid._pnpidcache_loaded", False)
+    pnp_ids_path = tmp_path / "pnp.ids"
+    pnp_ids_path.write_text("SAM\tSamsung Electric Company\n")
+    monkeypatch.setattr("DisplayCAL.edid.config.pydir", str(tmp_path))
+    monkeypatch.setattr(
+        "DisplayCAL.edid.os.path.isfile", lambda path: path == str(pnp_ids_path)
+    )
+    parse_pnpid_file_orig = edid.parse_pnpid_file
+    loaded_while_parsing = []
+
+    def parse_pnpid_file(path):
+        loaded_while_parsing.append(edid._pnpidcache_loaded)
+        parse_pnpid_file_orig(path)
+
+    monkeypatch.setattr("DisplayCAL.edid.parse_pnpid_file", parse_pnpid_file)
+    assert edid.get_manufacturer_name("SAM") == "Samsung Electric Company"
+    assert loaded_while_parsing == [False]
+    assert edid._pnpidcache_loaded
@@ -0,0 +1,213 @@
+# -*- coding: utf-8 -*-
+import atexit
+import importlib
+import sys
+import types
+
+import pytest
+
+
+class FakeTaskbarList(object):
+    """ITaskbarList3 stand-in recording the calls made to it."""
+
+    def __init__(self):
+        self.calls = []
+
+    def HrInit(self):
+        self.calls.append(("HrInit",))
+
+    def SetProgressValue(self, hwnd, value, maxv):
+        self.calls.append(("SetProgressValue", hwnd, value, maxv))
+
+    def SetProgressState(self, hwnd, state):
+        self.calls.append(("SetProgressState", hwnd, state))
+
+
+class FakeFrame(object):
+    """wx frame stand-in, falsy once destroyed."""
+
+    def __init__(self, handle):
+        self.handle = handle
+        self.alive = True
+
+    def __bool__(self):
+        return self.alive
+
+    def GetHandle(self):
+        return self.handle
+
+
+class COMError(Exception):
+    pass
+
+
+@pytest.fixture
+def fake_comtypes(monkeypatch):
+    """Stub out comtypes, so DisplayCAL.taskbar can be imported anywhere."""
+    comtypes = types.ModuleType("comtypes")
+    comtypes.COMError = COMError
+    comtypes.GUID = str
+    client = types.ModuleType("comtypes.client")
+    client.created = []
+
+    def CreateObject(clsid, interface=None):
+        if client.error:
+            raise client.error
+        taskbar_list = FakeTaskbarList()
+        client.created.append(taskbar_list)
+        return taskbar_list
+
+    client.CreateObject = CreateObject
+    client.error = None
+    gen = types.ModuleType("comtypes.gen")
+    tbl = types.ModuleType("comtypes.gen.TaskbarLib")
+    tbl.ITaskbarList3 = FakeTaskbarList
+    comtypes.client = client
+    comtypes.gen = gen
+    gen.TaskbarLib = tbl
+    monkeypatch.setitem(sys.modules, "comtypes", comtypes)
+    monkeypatch.setitem(sys.modules, "comtypes.client", client)
+    monkeypatch.setitem(sys.modules, "comtypes.gen", gen)
+    monkeypatch.setitem(sys.modules, "comtypes.gen.TaskbarLib", tbl)
+    return client
+
+
+@pytest.fixture
+def taskbar(fake_comtypes, monkeypatch):
+    """Freshly imported DisplayCAL.taskbar with a controllable clock."""
+    sys.modules.pop("DisplayCAL.taskbar", None)
+    module = importlib.import_module("DisplayCAL.taskbar")
+    clock = types.SimpleNamespace(now=100.0)
+    monkeypatch.setattr(
+        module, "time", types.SimpleNamespace(monotonic=lambda: clock.now)
+    )
+    module.clock = clock
+    yield module
+    atexit.unregister(module._release_taskbar)
+    sys.modules.pop("DisplayCAL.taskbar", None)
+
+
+def progress_values(taskbar):
+    """Return the values forwarded to SetProgressValue."""
+    return [
+        call[2] for call in taskbar.get_taskbar().calls if call[0] == "SetProgressValue"
+    ]
+
+
+def test_set_progress_value_skips_updates_within_the_same_percent(taskbar):
+    """Only updates that change the percentage or come 33 ms later are sent."""
+    tb = taskbar.Taskbar(FakeFrame(1), 1000)
+    for value in (0, 5, 9, 10, 15, 19):
+        tb.set_progress_value(value)
+    assert progress_values(taskbar) == [0, 10]
+    taskbar.clock.now += 0.034
+    tb.set_progress_value(19)
+    assert progress_values(taskbar) == [0, 10, 19]
+
+
+def test_set_progress_value_always_sends_the_final_value(taskbar):
+    """value == maxv is always sent."""
+    tb = taskbar.Taskbar(FakeFrame(1), 1000)
+    for value in (999, 1000, 1000):
+        tb.set_progress_value(value)
+    assert progress_values(taskbar) == [999, 1000, 1000]
+    assert taskbar.get_taskbar().calls[-1] == ("SetProgressValue", 1, 1000, 1000)
+
+
+def test_set_progress_state_resets_the_filter(taskbar):
+    """The first value after a state change is always sent."""
+    tb = taskbar.Taskbar(FakeFrame(1))
+    tb.set_progress_value(50)
+    tb.set_progress_state(taskbar.TBPF_PAUSED)
+    tb.set_progress_value(50)
+    assert taskbar.get_taskbar().calls[1:] == [
+        ("SetProgressValue", 1, 50, 100),
+        ("SetProgressState", 1, taskbar.TBPF_PAUSED),
+        ("SetProgressValue", 1, 50, 100),
+    ]
+
+
+def test_set_progress_value_ignores_destroyed_frames(taskbar):
+    """Nothing is sent for a frame that has been destroyed."""
+    frame = FakeFrame(1)
+    tb = taskbar.Taskbar(frame)
+    frame.alive = False
+    tb.set_progress_value(50)
+    tb.set_progress_state(taskbar.TBPF_NORMAL)
+    assert taskbar.get_taskbar().calls == [("HrInit",)]
+
+
+def test_taskbar_list_is_created_once(taskbar, fake_comtypes):
+    """All Taskbar instances share one ITaskbarList3."""
+    tb1 = taskbar.Taskbar(FakeFrame(1))
+    tb2 = taskbar.Taskbar(FakeFrame(2))
+    assert tb1.taskbar is tb2.taskbar
+    assert len(fake_comtypes.created) == 1
+
+
+def test_for_frame_reuses_taskbar(taskbar):
+    """for_frame() returns the same Taskbar for the same frame and maxv."""
+    frame = FakeFrame(1)
+    tb = taskbar.Taskbar.for_frame(frame)
+    assert taskbar.Taskbar.for_frame(frame) is tb
+    assert taskbar.Taskbar.for_frame(FakeFrame(2)) is not tb
+
+
+def test_for_frame_new_taskbar_for_different_maxv(taskbar):
+    """for_frame() creates a new Taskbar if maxv differs."""
+    frame = FakeFrame(1)
+    tb = taskbar.Taskbar.for_frame(frame)
+    tb_1000 = taskbar.Taskbar.for_frame(frame, 1000)
+    assert tb_1000 is not tb
+    assert tb_1000.maxv == 1000
+    assert taskbar.Taskbar.for_frame(frame, 1000) is tb_1000
+
+
+def test_for_frame_new_taskbar_for_destroyed_frame(taskbar):
+    """for_frame() doesn't return a Taskbar whose frame has been destroyed."""
+    frame = FakeFrame(1)
+    tb = taskbar.Taskbar.for_frame(frame)
+    frame.alive = False
+    # A new frame may get the same window handle
+    new_frame = FakeFrame(1)
+    new_tb = taskbar.Taskbar.for_frame(new_frame)
+    assert new_tb is not tb
+    assert new_tb.frame is new_frame
+
+
+def test_for_frame_new_taskbar_for_closed_taskbar(taskbar):
+    """for_frame() doesn't return a closed Taskbar."""
+    frame = FakeFrame(1)
+    tb = taskbar.Taskbar.for_frame(frame)
+    tb.close()
+    assert taskbar.Taskbar.for_frame(frame) is not tb
+
+
+def test_closed_taskbar_sends_nothing(taskbar):
+    """A closed Taskbar doesn't send anything and drops its interface."""
+    with taskbar.Taskbar(FakeFrame(1)) as tb:
+        tb.set_progress_value(10)
+    assert tb.taskbar is None
+    tb.set_progress_value(20)
+    tb.set_progress_state(taskbar.TBPF_NORMAL)
+    assert progress_values(taskbar) == [10]
+    assert taskbar.get_taskbar().calls == [
+        ("HrInit",),
+        ("SetProgressValue", 1, 10, 100),
+    ]
+
+
+def test_taskbar_is_a_no_op_if_taskbar_list_can_not_be_created(
+    taskbar, fake_comtypes, capsys
+):
+    """Taskbar does nothing if ITaskbarList3 can't be created."""
+    fake_comtypes.error = COMError("Class not registered")
+    tb = taskbar.Taskbar(FakeFrame(1))
+    tb.set_progress_value(10)
+    tb.set_progress_state(taskbar.TBPF_NORMAL)
+    assert tb.taskbar is None
+    assert "Class not registered" in capsys.readouterr().out
+    # Not tried again
+    fake_comtypes.error = None
+    assert taskbar.get_taskbar() is None
+    assert fake_comtypes.created == []